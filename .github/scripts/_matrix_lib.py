@@ -0,0 +1,306 @@
+"""
+Shared helpers for building the GitHub Actions matrix from ubuntu-versions.yml
+Used by generate-matrix.py.
+"""
+
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+
+# Bump when parsing or the cached layout changes so entries from older code are ignored
+CACHE_VERSION = 2
+
+def load_ubuntu_versions(config_file):
+    """Load and parse ubuntu-versions.yml
+
+    The result is always the JSON round-trip of the parsed YAML (e.g. mapping
+    keys are strings), whether or not it came from the on-disk cache. Files
+    with values JSON cannot represent are returned as parsed and never cached.
+    """
+    config_file = Path(config_file).resolve()
+    stat = config_file.stat()
+    key = [CACHE_VERSION, str(config_file), stat.st_mtime_ns, stat.st_size]
+    cache_dir = _cache_dir()
+    cache_file = None
+    if cache_dir is not None:
+        # crc32 keeps hashlib off the hit path; the full path in key guards against collisions
+        cache_file = cache_dir / f"{zlib.crc32(str(config_file).encode()):08x}.json"
+    
+    config = _read_cache(cache_file, key) if cache_file is not None else None
+    if config is None:
+        with open(config_file, 'r') as f:
+            text = f.read()
+        try:
+            config = _fast_parse(text)
+        except ValueError:
+            config = _yaml_load(text)
+        config = _write_cache(cache_file, key, config)
+    return config
+
+def _yaml_load(text):
+    """Parse text with PyYAML, imported only here so the fast and cached paths never load it"""
+    import yaml
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeLoader as Loader
+    return yaml.load(text, Loader=Loader)
+
+def _cache_dir():
+    """Return the cache directory under XDG_CACHE_HOME (default ~/.cache), or None to disable caching
+
+    Caching is off in CI: each job runs once on a fresh checkout, so the
+    cache would never hit and writing it is pure overhead.
+    """
+    if os.environ.get('CI'):
+        return None
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        try:
+            base = Path.home() / '.cache'
+        except (RuntimeError, KeyError):
+            return None
+    return Path(base) / 'iiab-matrix'
+
+def _read_cache(cache_file, key):
+    """Return the cached config if it was written for the same version/path/mtime/size key, else None"""
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get('key') != key:
+        return None
+    return cached.get('config')
+
+def _write_cache(cache_file, key, config):
+    """Atomically write config to cache_file and return its JSON round-trip
+
+    Write failures only cost a reparse next time.
+    """
+    try:
+        payload = json.dumps({'key': key, 'config': config})
+    except (TypeError, ValueError):
+        return config
+    config = json.loads(payload)['config']
+    if cache_file is None:
+        return config
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    except OSError:
+        pass
+    return config
+
+# Minimal parser for the subset of YAML used by ubuntu-versions.yml: top-level
+# scalars, literal (|) block scalars, and block lists of flat mappings with at
+# most one level of nested mapping. Anything else raises ValueError so the
+# caller falls back to PyYAML.
+
+_KEY_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_PLAIN_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_.\- ]*')
+_SINGLE_QUOTED_RE = re.compile(r"'((?:[^']|'')*)'\s*(?:#.*)?")
+_DOUBLE_QUOTED_RE = re.compile(r'"([^"\\]*)"\s*(?:#.*)?')
+# Plain scalars YAML 1.1 resolves to something other than a string
+_RESERVED = {'yes', 'no', 'true', 'false', 'on', 'off', 'null', 'nan', 'inf'}
+
+def _fast_parse(text):
+    """Parse ubuntu-versions.yml without PyYAML; raise ValueError on unsupported syntax"""
+    if '\t' in text:
+        raise ValueError('tabs are not supported')
+    lines = text.splitlines()
+    config = {}
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if _is_blank(line):
+            i += 1
+            continue
+        if _indent(line):
+            raise ValueError(f'unexpected indentation on line {i + 1}')
+        key, value = _split_key(line)
+        i += 1
+        if value == '|':
+            config[key], i = _parse_block_scalar(lines, i, 0)
+        elif value:
+            config[key] = _parse_scalar(value)
+        else:
+            config[key], i = _parse_block_list(lines, i)
+    # An empty or comment-only document is null in YAML
+    return config or None
+
+def _is_blank(line):
+    stripped = line.strip()
+    return not stripped or stripped.startswith('#')
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+def _split_key(line):
+    """Split 'key: value' into (key, value) with surrounding whitespace and bare comments removed"""
+    key, sep, value = line.strip().partition(':')
+    if not sep or not _KEY_RE.fullmatch(key) or key.lower() in _RESERVED or (value and not value.startswith(' ')):
+        raise ValueError(f'unsupported mapping entry: {line!r}')
+    value = value.strip()
+    if value.startswith('#'):
+        value = ''
+    return key, value
+
+def _parse_scalar(value):
+    if value.startswith("'"):
+        match = _SINGLE_QUOTED_RE.fullmatch(value)
+        if match:
+            return match.group(1).replace("''", "'")
+    elif value.startswith('"'):
+        match = _DOUBLE_QUOTED_RE.fullmatch(value)
+        if match:
+            return match.group(1)
+    else:
+        value = value.split(' #', 1)[0].rstrip()
+        if _PLAIN_RE.fullmatch(value) and value.lower() not in _RESERVED:
+            return value
+    raise ValueError(f'unsupported scalar: {value!r}')
+
+def _parse_block_scalar(lines, i, parent_indent):
+    """Parse a literal block scalar with default (clip) chomping"""
+    content = []
+    content_indent = None
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            if line and content_indent is not None and len(line) > content_indent:
+                raise ValueError(f'unsupported whitespace-only line {i + 1} in block scalar')
+            content.append('')
+            i += 1
+            continue
+        indent = _indent(line)
+        if content_indent is None:
+            if indent <= parent_indent:
+                break
+            content_indent = indent
+        elif indent < content_indent:
+            break
+        content.append(line[content_indent:])
+        i += 1
+    while content and not content[-1]:
+        content.pop()
+    return ('\n'.join(content) + '\n' if content else ''), i
+
+def _parse_block_list(lines, i):
+    """Parse a block list of mappings; return None for an empty value like YAML does"""
+    items = []
+    item_indent = None
+    while i < len(lines):
+        line = lines[i]
+        if _is_blank(line):
+            i += 1
+            continue
+        indent = _indent(line)
+        if item_indent is None:
+            if not line.lstrip().startswith('- '):
+                break
+            item_indent = indent
+        if indent < item_indent:
+            break
+        if indent == item_indent:
+            if not line[indent:].startswith('- '):
+                break
+            items.append({})
+            line = ' ' * (indent + 2) + line[indent + 2:]
+        elif indent != item_indent + 2:
+            raise ValueError(f'unexpected indentation on line {i + 1}')
+        i = _parse_item_entry(lines, i, line, items[-1], item_indent + 2)
+    return (items or None), i
+
+def _parse_item_entry(lines, i, line, item, key_indent):
+    """Parse one 'key: ...' entry of a list item, including nested mapping or block scalar"""
+    key, value = _split_key(line)
+    i += 1
+    if value == '|':
+        item[key], i = _parse_block_scalar(lines, i, key_indent)
+    elif value:
+        item[key] = _parse_scalar(value)
+    else:
+        nested = {}
+        nested_indent = None
+        while i < len(lines):
+            line = lines[i]
+            if _is_blank(line):
+                i += 1
+                continue
+            indent = _indent(line)
+            if indent <= key_indent:
+                break
+            if nested_indent is None:
+                nested_indent = indent
+            elif indent != nested_indent:
+                raise ValueError(f'unexpected indentation on line {i + 1}')
+            nested_key, nested_value = _split_key(line)
+            if not nested_value or nested_value == '|':
+                raise ValueError(f'unsupported nested value on line {i + 1}')
+            nested[nested_key] = _parse_scalar(nested_value)
+            i += 1
+        item[key] = nested or None
+    return i
+
+def check_fast_parse(config_file):
+    """Compare _fast_parse against PyYAML on config_file; return None if they agree, else the problem"""
+    with open(config_file, 'r') as f:
+        text = f.read()
+    expected = _yaml_load(text)
+    try:
+        actual = _fast_parse(text)
+    except ValueError as e:
+        return f"fast parser does not support this file ({e}); extend _fast_parse or PyYAML is always used"
+    if actual != expected:
+        return "fast parser output differs from PyYAML"
+    return None
+
+def generate_matrix(config, include_upcoming=False):
+    """Generate matrix from supported_versions (and optionally upcoming_versions) in config"""
+    # Add supported versions
+    matrix = [
+        {
+            'ubuntu_version': v['version'],
+            'ubuntu_lts': v.get('lts', v['version']),
+            'image_offer': v['image_offer'],
+            'image_sku': v['image_sku'],
+            'python_expected': v['python'],
+            'continue_on_error': v.get('status') != 'active'  # Only active versions fail build
+        }
+        for v in config.get('supported_versions', [])
+    ]
+    
+    # Add upcoming versions if requested
+    if include_upcoming:
+        matrix.extend(_upcoming_entry(v) for v in config.get('upcoming_versions', []))
+    
+    return matrix
+
+def _upcoming_entry(version):
+    """Build the matrix entry for one upcoming_versions item"""
+    # Use pre_release_image if available, otherwise use standard image
+    if 'pre_release_image' in version:
+        image_offer = version['pre_release_image']['offer']
+        image_sku = version['pre_release_image']['sku']
+    else:
+        image_offer = version['image_offer']
+        image_sku = version['image_sku']
+    
+    return {
+        'ubuntu_version': version['version'],
+        'ubuntu_lts': version.get('lts', version['version']),
+        'image_offer': image_offer,
+        'image_sku': image_sku,
+        'python_expected': version['python'],
+        'continue_on_error': True  # Upcoming versions always allow failure
+    }
@@ -7,53 +7,25 @@ Reads the centralized configuration and outputs JSON for workflow matrix.
 import argparse
 import json
 import sys
-import yaml
 from pathlib import Path
 
-def load_ubuntu_versions(config_file):
-    """Load and parse ubuntu-versions.yml"""
-    with open(config_file, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+from _matrix_lib import check_fast_parse, load_ubuntu_versions, generate_matrix
 
-def generate_matrix(config, include_upcoming=False):
-    """Generate matrix from supported_versions (and optionally upcoming_versions) in config"""
-    matrix = []
-    
-    # Add supported versions
-    for version in config.get('supported_versions', []):
-        entry = {
-            'ubuntu_version': version['version'],
-            'ubuntu_lts': version.get('lts', version['version']),
-            'image_offer': version['image_offer'],
-            'image_sku': version['image_sku'],
-            'python_expected': version['python'],
-            'continue_on_error': version.get('status') != 'active'  # Only active versions fail build
-        }
-        matrix.append(entry)
-    
-    # Add upcoming versions if requested
-    if include_upcoming:
-        for version in config.get('upcoming_versions', []):
-            # Use pre_release_image if available, otherwise use standard image
-            if 'pre_release_image' in version:
-                image_offer = version['pre_release_image']['offer']
-                image_sku = version['pre_release_image']['sku']
-            else:
-                image_offer = version['image_offer']
-                image_sku = version['image_sku']
-            
-            entry = {
-                'ubuntu_version': version['version'],
-                'ubuntu_lts': version.get('lts', version['version']),
-                'image_offer': image_offer,
-                'image_sku': image_sku,
-                'python_expected': version['python'],
-                'continue_on_error': True  # Upcoming versions always allow failure
-            }
-            matrix.append(entry)
-    
-    return matrix
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def write_json(obj, stream):
+    """Write obj to stream as compact JSON, using orjson when it is installed"""
+    write = stream.write
+    if orjson is not None:
+        write(orjson.dumps(obj).decode())
+    else:
+        # Stream chunks instead of building the whole document as one string
+        for chunk in json.JSONEncoder(separators=(',', ':')).iterencode(obj):
+            write(chunk)
+    write('\n')
 
 def main():
     parser = argparse.ArgumentParser(
@@ -64,6 +36,11 @@ def main():
         action='store_true',
         help='Include upcoming_versions (pre-release) in matrix'
     )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Verify the built-in YAML parser matches PyYAML on ubuntu-versions.yml and exit'
+    )
     args = parser.parse_args()
     
     script_dir = Path(__file__).parent
@@ -73,13 +50,20 @@ def main():
         print(f"Error: {config_file} not found", file=sys.stderr)
         sys.exit(1)
     
+    if args.check:
+        problem = check_fast_parse(config_file)
+        if problem:
+            print(f"Error: {problem}", file=sys.stderr)
+            sys.exit(1)
+        print(f"OK: built-in parser matches PyYAML for {config_file.name}")
+        return
+    
     try:
         config = load_ubuntu_versions(config_file)
         matrix = generate_matrix(config, include_upcoming=args.include_upcoming)
         
         # Output as GitHub Actions matrix JSON
-        output = {'include': matrix}
-        print(json.dumps(output))
+        write_json({'include': matrix}, sys.stdout)
         
     except Exception as e:
         print(f"Error generating matrix: {e}", file=sys.stderr)
@@ -5,6 +5,8 @@ Polls until installation completes, then runs verification.
 Usage: python3 monitor_installation.py [VM_NAME]
 """
 
+import atexit
+import json
 import subprocess
 import time
 import sys
@@ -12,23 +14,37 @@ from datetime import datetime
 import argparse
 
 DEFAULT_VM_NAME = "iiab-lokole-test"
+FAST_POLL_INTERVAL = 30  # early polls and once ansible has exited
 POLL_INTERVAL = 120  # 2 minutes
-MAX_POLLS = 90  # 3 hours max
+SLOW_POLL_INTERVAL = 300  # 5 minutes, after the first hour
+FAST_POLLS = 10  # fast polls at startup, and again after ansible stops
+SLOW_AFTER = 60 * 60  # 1 hour
+MAX_DURATION = 3 * 60 * 60  # 3 hours max
+
+_log_handles = {}
+
+def _get_log_handle(log_file):
+    """Return a line-buffered append handle for log_file, kept open until exit."""
+    fh = _log_handles.get(log_file)
+    if fh is None:
+        fh = open(log_file, 'a', buffering=1)
+        atexit.register(fh.close)
+        _log_handles[log_file] = fh
+    return fh
 
 def log(message, log_file):
     """Log message to both console and file."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_message = f"[{timestamp}] {message}"
     print(log_message)
-    with open(log_file, 'a') as f:
-        f.write(log_message + '\n')
+    _get_log_handle(log_file).write(log_message + '\n')
 
-def run_command(cmd, timeout=30):
-    """Run command and return output."""
+def run_command(argv, timeout=30):
+    """Run command (argv list, no shell) and return output."""
     try:
         result = subprocess.run(
-            cmd,
-            shell=True,
+            argv,
+            shell=False,
             capture_output=True,
             text=True,
             timeout=timeout
@@ -39,28 +55,58 @@ def run_command(cmd, timeout=30):
     except Exception as e:
         return -2, "", str(e)
 
-def check_installation_complete(vm_name):
-    """Check if IIAB installation is complete."""
-    cmd = f'multipass exec {vm_name} -- bash -c "grep -q RECAP /opt/iiab/iiab/iiab-install.log 2>/dev/null"'
-    returncode, _, _ = run_command(cmd, timeout=30)
-    return returncode == 0
+# Prints "<grep rc> <pgrep rc>": RECAP found in install log, ansible-playbook running.
+# The [a] pattern keeps pgrep -f from matching this bash -c command line itself.
+REMOTE_CHECK_SCRIPT = (
+    "grep -q RECAP /opt/iiab/iiab/iiab-install.log 2>/dev/null; a=$?; "
+    "pgrep -f '[a]nsible-playbook' >/dev/null; b=$?; "
+    'echo "$a $b"'
+)
 
-def check_process_running(vm_name):
-    """Check if ansible/installation process is still running."""
-    cmd = f'multipass exec {vm_name} -- bash -c "pgrep -f ansible-playbook > /dev/null"'
-    returncode, _, _ = run_command(cmd, timeout=30)
-    return returncode == 0
+def poll_remote(vm_name):
+    """Return (complete, running) from a single multipass exec, or None if the check failed."""
+    cmd = ["multipass", "exec", vm_name, "--", "bash", "-c", REMOTE_CHECK_SCRIPT]
+    returncode, stdout, _ = run_command(cmd, timeout=30)
+    codes = stdout.split()
+    if returncode != 0 or len(codes) != 2:
+        return None
+    return codes[0] == "0", codes[1] == "0"
 
 def get_vm_status(vm_name):
     """Get VM status."""
-    cmd = f'multipass list | grep {vm_name}'
-    _, stdout, _ = run_command(cmd)
-    if stdout:
-        parts = stdout.split()
-        if len(parts) >= 2:
-            return parts[1]
+    cmd = ["multipass", "info", vm_name, "--format", "json"]
+    returncode, stdout, _ = run_command(cmd, timeout=30)
+    if returncode == 0 and stdout:
+        try:
+            return json.loads(stdout)["info"][vm_name]["state"]
+        except (ValueError, KeyError, TypeError):
+            pass
     return "Unknown"
 
+def poll_installation(vm_name):
+    """Collect installation and VM state for one poll; running is None if the remote check failed."""
+    result = poll_remote(vm_name)
+    installed, running = result if result is not None else (False, None)
+    return {
+        "installed": installed,
+        "running": running,
+        # VM state is only reported while still waiting, so skip the call once complete
+        "status": None if installed else get_vm_status(vm_name),
+    }
+
+def next_poll_interval(poll_count, elapsed, stopped_polls):
+    """Pick the sleep before the next poll: dense early and near completion, sparse mid-install.
+
+    stopped_polls counts polls since ansible was last seen running (0 while it runs).
+    Only the first FAST_POLLS of those are fast, so a crashed install that never
+    writes RECAP falls back to the normal schedule.
+    """
+    if poll_count < FAST_POLLS or 0 < stopped_polls <= FAST_POLLS:
+        return FAST_POLL_INTERVAL
+    if elapsed >= SLOW_AFTER:
+        return SLOW_POLL_INTERVAL
+    return POLL_INTERVAL
+
 def main():
     """Main monitoring loop."""
     parser = argparse.ArgumentParser(description='Monitor IIAB installation')
@@ -79,30 +125,45 @@ def main():
     
     # Monitor installation
     log("\n\ud83d\udcca Phase 1: Monitoring IIAB installation...", log_file)
-    log(f"Polling every {POLL_INTERVAL/60:.0f} minutes for completion...", log_file)
+    log(f"Polling every {FAST_POLL_INTERVAL}s-{SLOW_POLL_INTERVAL/60:.0f} minutes for completion...", log_file)
     
     poll_count = 0
     installation_complete = False
+    process_seen = False
+    stopped_polls = 0
+    start_time = time.monotonic()
+    interval = 0
     
-    while poll_count < MAX_POLLS:
+    while time.monotonic() - start_time < MAX_DURATION:
+        if poll_count > 0:
+            time.sleep(interval)
         poll_count += 1
         log(f"\n⏱️ Poll #{poll_count}: Checking installation status...", log_file)
         
-        if check_installation_complete(vm_name):
+        state = poll_installation(vm_name)
+        
+        if state["installed"]:
             log("\u2705 Installation COMPLETE!", log_file)
             installation_complete = True
             break
         
-        if check_process_running(vm_name):
+        if state["running"] is None:
+            # Leave process_seen/stopped_polls alone; a failed exec says nothing about ansible
+            log("   \u26a0️ Installation check failed", log_file)
+        elif state["running"]:
             log("   \u23f3 Installation still in progress...", log_file)
+            process_seen = True
+            stopped_polls = 0
         else:
             log("   \u26a0️ Installation process not detected", log_file)
+            # ansible exiting after having run usually means RECAP is imminent
+            if process_seen:
+                stopped_polls += 1
         
-        vm_status = get_vm_status(vm_name)
-        log(f"   VM Status: {vm_status}", log_file)
+        log(f"   VM Status: {state['status']}", log_file)
         
-        if poll_count < MAX_POLLS:
-            time.sleep(POLL_INTERVAL)
+        elapsed = time.monotonic() - start_time
+        interval = next_poll_interval(poll_count, elapsed, stopped_polls)
     
     if not installation_complete:
         log("\n\u274c Maximum polling time reached", log_file)